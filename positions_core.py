@@ -0,0 +1,83 @@
+import math
+import numpy as np
+from numba import njit
+
+# Bottom exclusion boundary
+EXCLUSION_BOTTOM = -150 + 7.5  # -142.5mm
+
+# =============================================
+# Compiled Kernels
+# =============================================
+@njit(cache=True)
+def _balance(count, xmin, xmax, ymin, ymax, R):
+    """Buffer symmetry score from the layout extents; 0 for an empty layout"""
+    if count == 0:
+        return 0.0
+    return 1 - (abs(xmax + xmin) + abs(ymax + ymin)) / (2 * R)
+
+@njit(cache=True, fastmath=True)
+def _grid(dx, dy, w, h, sp, R):
+    """Collect valid die centres and their extents in a single pass"""
+    period_x = w + sp
+    period_y = h + sp
+
+    # Loop invariants, hoisted out of the inner loop
+    w2 = w / 2
+    h2 = h / 2
+    R2 = R * R
+
+    # Grid boundaries with conservative estimation
+    max_x_offset = R - w2
+    max_y_offset = R - h2
+
+    i_min = math.ceil((-max_x_offset - dx) / period_x)
+    i_max = math.floor((max_x_offset - dx) / period_x)
+    j_min = math.ceil((-max_y_offset - dy) / period_y)
+    j_max = math.floor((max_y_offset - dy) / period_y)
+
+    n_est = max(i_max - i_min + 1, 0) * max(j_max - j_min + 1, 0)
+    out = np.empty((n_est, 2))
+    k = 0
+    # Finite sentinels: fastmath assumes no infinities
+    xmin, xmax = 1e18, -1e18
+    ymin, ymax = 1e18, -1e18
+
+    for i in range(i_min, i_max + 1):
+        x = dx + i * period_x
+        for j in range(j_min, j_max + 1):
+            y = dy + j * period_y
+
+            # Clear of the bottom exclusion, and the farthest corner,
+            # (|x| + w/2, |y| + h/2), inside the effective area
+            cx = abs(x) + w2
+            cy = abs(y) + h2
+            ok = ((y - h2) >= EXCLUSION_BOTTOM) & (cx * cx + cy * cy <= R2)
+
+            # Branchless accept: always store, only advance k when the die fits
+            out[k, 0] = x
+            out[k, 1] = y
+            k += ok
+            xmin = min(xmin, x) if ok else xmin
+            xmax = max(xmax, x) if ok else xmax
+            ymin = min(ymin, y) if ok else ymin
+            ymax = max(ymax, y) if ok else ymax
+
+    return out[:k], xmin, xmax, ymin, ymax
+
+@njit(cache=True)
+def _search(params, w, h, sp, R):
+    """Evaluate die count and balance for every (dx, dy) row of params"""
+    n = params.shape[0]
+    counts = np.zeros(n, dtype=np.int64)
+    balances = np.empty(n)
+
+    for k in range(n):
+        positions, xmin, xmax, ymin, ymax = _grid(params[k, 0], params[k, 1], w, h, sp, R)
+        counts[k] = positions.shape[0]
+        balances[k] = _balance(counts[k], xmin, xmax, ymin, ymax, R)
+
+    return counts, balances
+
+# Pay the compile cost once at import rather than on the first click
+_grid(0.0, 0.0, 1.0, 1.0, 0.1, 10.0)
+_search(np.zeros((1, 2)), 1.0, 1.0, 0.1, 10.0)
@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pytest
+
+from positions_core import _balance, _grid
+
+# =============================================
+# Baseline Reference
+# =============================================
+def baseline_positions(dx, dy, width, height, spacing, effective_radius):
+    """Original double loop with the four-corner check, kept as the reference"""
+    period_x = width + spacing
+    period_y = height + spacing
+    positions = []
+
+    max_x_offset = effective_radius - width/2
+    max_y_offset = effective_radius - height/2
+
+    i_min = math.ceil((-max_x_offset - dx) / period_x)
+    i_max = math.floor((max_x_offset - dx) / period_x)
+    j_min = math.ceil((-max_y_offset - dy) / period_y)
+    j_max = math.floor((max_y_offset - dy) / period_y)
+
+    exclusion_bottom = -150 + 7.5  # -142.5mm
+
+    for i in range(i_min, i_max + 1):
+        x = dx + i * period_x
+        for j in range(j_min, j_max + 1):
+            y = dy + j * period_y
+            if (y - height/2) < exclusion_bottom:
+                continue
+            valid = True
+            for sx in (-1, 1):
+                for sy in (-1, 1):
+                    cx = x + sx * width/2
+                    cy = y + sy * height/2
+                    if cx**2 + cy**2 > effective_radius**2:
+                        valid = False
+                        break
+                if not valid:
+                    break
+            if valid:
+                positions.append((x, y))
+
+    return positions
+
+# =============================================
+# Tests
+# =============================================
+@pytest.mark.parametrize("dx, dy, width, height, spacing, effective_radius", [
+    (0.0, 0.0, 50.0, 50.0, 0.1, 147.0),
+    (0.0, 0.0, 10.0, 10.0, 0.1, 147.0),
+    (2.5, -3.1, 10.0, 10.0, 0.1, 147.0),
+    (-1.2, 4.0, 5.0, 7.0, 0.2, 145.0),
+    (7.3, 2.2, 43.85, 15.27, 0.95, 147.0),
+    (30.0, -15.0, 120.0, 60.0, 0.1, 147.0),
+    (0.0, 0.0, 200.0, 200.0, 0.1, 147.0),
+])
+def test_grid_matches_baseline_loop(dx, dy, width, height, spacing, effective_radius):
+    positions, xmin, xmax, ymin, ymax = _grid(dx, dy, width, height, spacing, effective_radius)
+    expected = np.array(baseline_positions(dx, dy, width, height, spacing, effective_radius)).reshape(-1, 2)
+
+    assert positions.shape == expected.shape
+    np.testing.assert_allclose(positions, expected)
+    if expected.shape[0] > 0:
+        np.testing.assert_allclose((xmin, xmax, ymin, ymax), (
+            expected[:, 0].min(), expected[:, 0].max(),
+            expected[:, 1].min(), expected[:, 1].max()
+        ))
+
+def test_balance():
+    assert _balance(0, 1e18, -1e18, 1e18, -1e18, 147.0) == 0.0
+    assert _balance(4, -10.0, 10.0, -5.0, 5.0, 147.0) == 1.0
+    assert _balance(2, -10.0, 20.0, -5.0, 5.0, 100.0) == pytest.approx(0.95)
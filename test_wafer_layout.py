@@ -0,0 +1,42 @@
+import os
+import runpy
+
+import numpy as np
+import pytest
+
+APP_PATH = os.path.join(os.path.dirname(__file__), "wafer-layout.py")
+
+# =============================================
+# Tests
+# =============================================
+@pytest.fixture(scope="module")
+def app():
+    """Load the Streamlit script's functions without clicking Generate"""
+    return runpy.run_path(APP_PATH)
+
+# Die counts (max, symmetric, centered) from the original 10x10 sweep
+@pytest.mark.parametrize("width, height, spacing, effective_radius, counts", [
+    (50.0, 50.0, 0.1, 147.0, (21, 21, 21)),
+    (10.0, 10.0, 0.1, 147.0, (616, 616, 596)),
+    (5.0, 7.0, 0.2, 145.0, (1679, 1673, 1673)),
+    (20.0, 13.0, 0.5, 140.0, (194, 192, 191)),
+    (120.0, 60.0, 0.1, 147.0, (4, 4, 3)),
+    (43.85, 15.27, 0.95, 147.0, (76, 74, 69)),
+    (9.01, 21.3, 0.74, 147.0, (279, 276, 274)),
+])
+def test_find_optimal_layouts_matches_baseline(app, width, height, spacing, effective_radius, counts):
+    layouts = app["find_optimal_layouts"](width, height, spacing, effective_radius)
+
+    assert tuple(layout["count"] for layout in layouts) == counts
+    for layout in layouts:
+        assert layout["positions"].shape == (layout["count"], 2)
+    assert app["is_symmetric"](layouts[1]["positions"])
+
+def test_is_symmetric(app):
+    is_symmetric = app["is_symmetric"]
+    positions = np.array([(1.5, 2.0), (-1.5, 2.0), (1.5, -2.0), (-1.5, -2.0)])
+    assert is_symmetric(positions)
+    assert not is_symmetric(positions[:3])
+    assert is_symmetric(np.empty((0, 2)))
+    with pytest.raises(ValueError):
+        is_symmetric(positions * 100, tolerance=1e-12)
@@ -1,8 +1,10 @@
+import itertools
 import math
 import numpy as np
 import streamlit as st
-from matplotlib.figure import Figure
-from matplotlib.patches import Rectangle, Circle, Wedge, Polygon
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from positions_core import EXCLUSION_BOTTOM, _balance, _grid, _search
 
 st.set_page_config(
     page_title="Wafer Layout Planner",
@@ -29,190 +31,182 @@ with st.sidebar:
 # Core Algorithm
 # =============================================
 def generate_positions(dx, dy, width, height, spacing, effective_radius):
-    """Generate valid die positions with precise boundary checks"""
-    period_x = width + spacing
-    period_y = height + spacing
-    positions = []
-    
-    # Grid boundaries with conservative estimation
-    max_x_offset = effective_radius - width/2
-    max_y_offset = effective_radius - height/2
-    
-    i_min = math.ceil((-max_x_offset - dx) / period_x)
-    i_max = math.floor((max_x_offset - dx) / period_x)
-    j_min = math.ceil((-max_y_offset - dy) / period_y)
-    j_max = math.floor((max_y_offset - dy) / period_y)
+    """Generate valid die positions as an (N, 2) array, plus their (xmin, xmax, ymin, ymax) extents"""
+    positions, *extents = _grid(float(dx), float(dy), float(width), float(height),
+                                float(spacing), float(effective_radius))
+    return positions, extents
 
-    # Bottom exclusion boundary
-    exclusion_bottom = -150 + 7.5  # -142.5mm
+def is_symmetric(positions, tolerance=1e-6):
+    """Check if positions are symmetric across both X and Y axes by comparing sorted integer keys."""
+    if positions.shape[0] == 0:
+        return True
+    
+    # Quantize to integer multiples of tolerance to handle floating-point precision
+    scaled = np.rint(positions / tolerance)
+    
+    # Pack each (x, y) into one int64 as x * y_span + y so a plain 1-D sort orders
+    # the set; y_span covers every y and its mirror, so keys stay unique
+    x_max = int(np.abs(scaled[:, 0]).max())
+    y_span = 2 * int(np.abs(scaled[:, 1]).max()) + 1
+    if (x_max + 1) * y_span >= 2**63:
+        raise ValueError("Symmetry tolerance too fine for the wafer coordinates")
+    
+    q = scaled.astype(np.int64)
+    qx, qy = q[:, 0], q[:, 1]
+    keys = np.sort(qx * y_span + qy)
+    
+    # Y-axis mirror, then X-axis mirror
+    return (np.array_equal(keys, np.sort(-qx * y_span + qy)) and
+            np.array_equal(keys, np.sort(qx * y_span - qy)))
 
-    for i in range(i_min, i_max + 1):
-        x = dx + i * period_x
-        for j in range(j_min, j_max + 1):
-            y = dy + j * period_y
-            
-            # Check bottom exclusion
-            if (y - height/2) < exclusion_bottom:
-                continue
-                
-            # Verify all four corners fit in effective area
-            valid = True
-            for sx in (-1, 1):
-                for sy in (-1, 1):
-                    cx = x + sx * width/2
-                    cy = y + sy * height/2
-                    if cx**2 + cy**2 > effective_radius**2:
-                        valid = False
-                        break
-                if not valid:
-                    break
-                    
-            if valid:
-                positions.append((x, y))
-                
-    return positions
+def calculate_balance(count, extents, effective_radius):
+    """Calculate buffer symmetry score from the layout extents"""
+    return _balance(count, *extents, float(effective_radius))
 
-def is_symmetric(positions, tolerance=1e-6):
-    """Check if positions are symmetric across both X and Y axes using set lookups."""
-    pos_set = {(round(x, 6), round(y, 6)) for x, y in positions}  # Rounded to handle floating-point precision
-    
-    for x, y in pos_set:
-        # Check Y-axis mirror
-        if (-x, y) not in pos_set:
-            return False
-        # Check X-axis mirror
-        if (x, -y) not in pos_set:
-            return False
-    return True
+# (-dx, dy) is an exact Y-axis mirror of (dx, dy) with the same count and balance,
+# but the bottom exclusion breaks the X-axis mirror, so dy keeps both signs
+QUADRANTS = ((1, 1), (1, -1))
 
-def calculate_balance(positions, effective_radius):
-    """Calculate buffer symmetry score"""
-    if not positions:
-        return 0.0
-    
-    x_vals = [x for x, _ in positions]
-    y_vals = [y for _, y in positions]
-    
-    max_x = max(x_vals, default=0)
-    min_x = min(x_vals, default=0)
-    max_y = max(y_vals, default=0)
-    min_y = min(y_vals, default=0)
-    
-    h_diff = abs(max_x + min_x)
-    v_diff = abs(max_y + min_y)
-    
-    return 1 - (h_diff + v_diff) / (2 * effective_radius)
+def search_offsets(dxs, dys, quadrants, width, height, spacing, effective_radius):
+    """Evaluate every (dx, dy, quadrant) combination in one compiled sweep"""
+    params = np.array([
+        (sx * dx, sy * dy)
+        for dx, dy, (sx, sy) in itertools.product(dxs, dys, quadrants)
+    ], dtype=float)
+    counts, balances = _search(params, float(width), float(height),
+                               float(spacing), float(effective_radius))
+    return params, counts, balances
 
+@st.cache_data(max_entries=128)
 def find_optimal_layouts(width, height, spacing, effective_radius):
     """Optimized layout search with symmetry handling"""
-    best_max = {"count": 0, "positions": [], "balance": 0}
-    best_sym = {"count": 0, "positions": [], "balance": 0}
+    best_max = {"count": 0, "positions": np.empty((0, 2)), "balance": 0}
+    best_sym = {"count": 0, "positions": np.empty((0, 2)), "balance": 0}
     
-    # Always check centered layout first
-    centered = generate_positions(0, 0, width, height, spacing, effective_radius)
-    centered_count = len(centered)
-    if centered_count > 0:
-        best_max = {
-            "count": centered_count,
-            "positions": centered,
-            "balance": calculate_balance(centered, effective_radius)
-        }
-        #if is_symmetric(centered):
-           # best_sym = best_max.copy()
+    # Always check centered layout first; it seeds the search and is returned as-is
+    centered, extents = generate_positions(0, 0, width, height, spacing, effective_radius)
+    centered_layout = {
+        "count": centered.shape[0],
+        "positions": centered,
+        "balance": calculate_balance(centered.shape[0], extents, effective_radius)
+    }
+    if centered_layout["count"] > 0:
+        best_max = centered_layout
     
-
+    half_x = (spacing+width)/2
+    half_y = (spacing+height)/2
     
-    for dx in np.linspace(0, (spacing+width)/2, 10):
-        #print("check:", dx)
-        for dy in np.linspace(0, (spacing+height)/2, 10):
-            for quadrant in [(dx, dy), (-dx, dy), (dx, -dy), (-dx, -dy)]:
-                positions = generate_positions(quadrant[0], quadrant[1], 
-                                              width, height, spacing, effective_radius)
-                count = len(positions)
-                #print("type-",count)
-                if count > best_max["count"]:
-                    best_max = {
-                        "count": count,
-                        "positions": positions,
-                        "balance": calculate_balance(positions, effective_radius)
-                    }
-                
-
-                if is_symmetric(positions):
-                    #print("sym- ", count)
-                    current_balance = calculate_balance(positions, effective_radius)
-                    if count > best_sym["count"] or \
-                      (count == best_sym["count"] and current_balance > best_sym["balance"]):
-                        best_sym = {
-                            "count": count,
-                            "positions": positions,
-                            "balance": current_balance
-                        }
-                       
+    # Flat sweep over the full offset range
+    params, counts, balances = search_offsets(
+        np.linspace(0, half_x, 10), np.linspace(0, half_y, 10), QUADRANTS,
+        width, height, spacing, effective_radius
+    )
     
-    return best_max, best_sym, {
-        "count": len(centered),
-        "positions": centered,
-        "balance": calculate_balance(centered, effective_radius)
-    }
+    # argmax returns the first maximum, matching the sequential sweep order
+    k = int(np.argmax(counts))
+    if counts[k] > best_max["count"]:
+        best_max = {
+            "count": int(counts[k]),
+            "positions": generate_positions(*params[k], width, height, spacing, effective_radius)[0],
+            "balance": float(balances[k])
+        }
+    
+    # Mirroring x = dx + i*period onto itself needs 2*dx/period to be an integer,
+    # so only offsets of 0 or half a period can ever give a symmetric layout
+    sym_params, counts, balances = search_offsets(
+        (0, half_x), (0, half_y), ((1, 1),),
+        width, height, spacing, effective_radius
+    )
+    
+    # Walk candidates by count, then balance; the first symmetric one is the best
+    for k in np.lexsort((-balances, -counts)):
+        if counts[k] == 0:
+            break
+        # Row 0 is the (0, 0) offset, already generated as the centered layout
+        positions = centered if k == 0 else \
+            generate_positions(*sym_params[k], width, height, spacing, effective_radius)[0]
+        if is_symmetric(positions):
+            best_sym = {
+                "count": int(counts[k]),
+                "positions": positions,
+                "balance": float(balances[k])
+            }
+            break
+    
+    return best_max, best_sym, centered_layout
 
 # =============================================
 # Visualization
 # =============================================
-def create_wafer_plot(layout, title, width, height, effective_radius):
-    """Generate a wafer plot with dies"""
-    fig = Figure(figsize=(8, 8))
-    ax = fig.add_subplot(111)
-    
+def draw_wafer_plot(fig, col, layout, width, height, effective_radius):
+    """Draw a wafer with dies into the given subplot column"""
     # Wafer boundaries
-    ax.add_patch(Circle((0, 0), 150, edgecolor='black', facecolor='none', linewidth=3))
-    ax.add_patch(Circle((0, 0), effective_radius, edgecolor='red', linestyle='-', facecolor='none', linewidth=2, alpha=0.5))
-    
-    # Fill area between wafer edge and effective radius with Wedge
+    fig.add_shape(type='circle', x0=-150, y0=-150, x1=150, y1=150,
+                  line=dict(color='black', width=3), row=1, col=col)
+    fig.add_shape(type='circle', x0=-effective_radius, y0=-effective_radius,
+                  x1=effective_radius, y1=effective_radius,
+                  line=dict(color='red', width=2), opacity=0.5, row=1, col=col)
+    
+    # Fill area between wafer edge and effective radius: outer ring one way,
+    # inner ring the other, so the nonzero fill leaves the centre open
     if effective_radius < 150:
-        wedge = Wedge(
-            (0, 0), 150, 0, 360, width=150 - effective_radius,
-            facecolor='red', alpha=0.3, edgecolor='none'
-        )
-        ax.add_patch(wedge)
-    
-    # Dies
-    for x, y in layout["positions"]:
-        ax.add_patch(Rectangle(
-            (x - width/2, y - height/2), width, height,
-            edgecolor='navy', facecolor='skyblue', alpha=0.7
-        ))
+        theta = np.linspace(0, 2 * np.pi, 361)
+        ring_x = np.concatenate([150 * np.cos(theta), effective_radius * np.cos(theta[::-1])])
+        ring_y = np.concatenate([150 * np.sin(theta), effective_radius * np.sin(theta[::-1])])
+        fig.add_trace(go.Scatter(
+            x=ring_x, y=ring_y, fill='toself', mode='none',
+            fillcolor='rgba(255, 0, 0, 0.3)', hoverinfo='skip'
+        ), row=1, col=col)
+    
+    # Dies, as one filled trace of closed rectangles separated by gaps
+    positions = layout["positions"]
+    corners = np.array([(-width/2, -height/2), (width/2, -height/2), (width/2, height/2),
+                        (-width/2, height/2), (-width/2, -height/2), (np.nan, np.nan)])
+    outlines = (positions[:, None, :] + corners).reshape(-1, 2)
+    fig.add_trace(go.Scatter(
+        x=outlines[:, 0], y=outlines[:, 1], fill='toself', mode='lines',
+        line=dict(color='navy', width=1), fillcolor='rgba(135, 206, 235, 0.7)',
+        hoverinfo='skip'
+    ), row=1, col=col)
     
     # Exclusion zones
-    exclusion_bottom = -150 + 7.5  # -142.5mm
-    
     # Calculate intersection points with wafer edge
     try:
-        x_intersect = math.sqrt(150**2 - exclusion_bottom**2)
+        x_intersect = math.sqrt(150**2 - EXCLUSION_BOTTOM**2)
     except ValueError:
         x_intersect = 0  # Handle case where line is completely outside
     
     x_left = -x_intersect
     x_right = x_intersect
     
-    # Plot clipped exclusion line
-    ax.plot([x_left, x_right], [exclusion_bottom, exclusion_bottom], 
-           color='red', linestyle='-', linewidth=1)
-    
-    # Fill area between clipped line and wafer edge with green Polygon
+    # Plot clipped exclusion line, filling the area below it to the wafer edge
     if x_intersect > 0:
-        exclusion_polygon = Polygon(
-            [(x_left, exclusion_bottom), (x_right, exclusion_bottom), (0, -150)],
-            closed=True, facecolor='red', alpha=0.3, edgecolor='none'
-        )
-        ax.add_patch(exclusion_polygon)
+        fig.add_trace(go.Scatter(
+            x=[x_left, x_right, 0, x_left],
+            y=[EXCLUSION_BOTTOM, EXCLUSION_BOTTOM, -150, EXCLUSION_BOTTOM],
+            fill='toself', mode='none', fillcolor='rgba(255, 0, 0, 0.3)', hoverinfo='skip'
+        ), row=1, col=col)
+    fig.add_trace(go.Scatter(
+        x=[x_left, x_right], y=[EXCLUSION_BOTTOM, EXCLUSION_BOTTOM],
+        mode='lines', line=dict(color='red', width=1), hoverinfo='skip'
+    ), row=1, col=col)
     
     # Formatting
-    ax.set_title(f"{title}\n{layout['count']} Dies", fontsize=14, pad=15)
-    ax.set_xlim(-160, 160)
-    ax.set_ylim(-160, 160)
-    ax.set_aspect('equal')
-    ax.grid(True, alpha=0.3)
+    fig.update_xaxes(range=[-160, 160], row=1, col=col)
+    fig.update_yaxes(range=[-160, 160], scaleanchor=f"x{col}", scaleratio=1, row=1, col=col)
+
+@st.cache_data(max_entries=128)
+def create_all_plots(max_layout, sym_layout, centered_layout, width, height, effective_radius):
+    """Generate one interactive figure with the three wafer plots side by side"""
+    layouts = {"Max Count": max_layout, "Symmetric Optimized": sym_layout, "Centered": centered_layout}
+    fig = make_subplots(rows=1, cols=3, subplot_titles=[
+        f"{title}<br>{layout['count']} Dies" for title, layout in layouts.items()
+    ])
+    for col, layout in enumerate(layouts.values(), start=1):
+        draw_wafer_plot(fig, col, layout, width, height, effective_radius)
+    fig.update_layout(height=600, showlegend=False, plot_bgcolor='white')
+    fig.update_xaxes(showgrid=True, gridcolor='rgba(0, 0, 0, 0.1)', zeroline=False)
+    fig.update_yaxes(showgrid=True, gridcolor='rgba(0, 0, 0, 0.1)', zeroline=False)
     return fig
 
 # =============================================
@@ -235,13 +229,9 @@ if generate_btn:
         )
         
         # Display results
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.pyplot(create_wafer_plot(max_layout, "Max Count", width, height, effective_radius))
-        with col2:
-            st.pyplot(create_wafer_plot(sym_layout, "Symmetric Optimized", width, height, effective_radius))
-        with col3:
-            st.pyplot(create_wafer_plot(centered_layout, "Centered", width, height, effective_radius))
+        st.plotly_chart(create_all_plots(max_layout, sym_layout, centered_layout,
+                                         width, height, effective_radius),
+                        width='stretch')
             
         # Comparison table
         st.subheader("Layout Comparison")
@@ -252,7 +242,7 @@ if generate_btn:
                              f"{sym_layout['balance']:.1%}", 
                              f"{centered_layout['balance']:.1%}"]
         }
-        st.dataframe(comparison_data, use_container_width=True, hide_index=True)
+        st.dataframe(comparison_data, width='stretch', hide_index=True)
         
     except Exception as e:
         st.error(f"Error: {str(e)}")